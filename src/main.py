@@ -1,151 +1,873 @@
+import os
 import sys
+import csv
+import copy
+import time
+import struct
 import argparse
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QLabel, QLineEdit, 
-                             QPushButton, QComboBox, QVBoxLayout, QWidget, QMessageBox)
-from PyQt5.QtCore import pyqtSignal, Qt, QTimer
+import threading
+from contextlib import contextmanager
+from operator import attrgetter
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel,
+                             QVBoxLayout, QHBoxLayout, QWidget, QComboBox,
+                             QLineEdit, QPlainTextEdit, QGridLayout, QMessageBox)
+from PyQt5.QtCore import (Qt, QTimer, QThread, QObject, QMetaObject, Q_ARG,
+                          QRunnable, QThreadPool, pyqtSignal, pyqtSlot)
 import obd
-import time
+
+# Mode 01 accepts up to six PIDs in a single request
+MAX_PIDS_PER_REQUEST = 6
+
+# Polling pace: stay under the bus's soft request ceiling and leave it idle
+# for at least as long as the last pass took (seconds unless noted)
+MAX_REQUESTS_PER_SECOND = 20
+MIN_POLL_INTERVAL = 0.25
+PACING_FACTOR = 2
+RT_EWMA_ALPHA = 0.2
+
+# Requests that keep coming back empty are retried less and less often
+NULL_BACKOFF_THRESHOLD = 3  # consecutive empty replies
+NULL_BACKOFF_INITIAL = 2.0
+NULL_BACKOFF_MAX = 60.0
+
+# Console keeps only the most recent lines so a long drive can't grow it forever
+CONSOLE_MAX_LINES = 500
+LOG_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def format_quantity(value):
+    """Format a Pint quantity for a dashboard label."""
+    return f"{value.magnitude:.1f} {value.units}"
+
+
+def format_whole(value):
+    """Format a Pint quantity whose PID resolves to about one unit, as an integer."""
+    return "%d %s" % (round(value.magnitude), value.units)
+
+
+# Dashboard metrics as (name, command, formatter). All of these decode to Pint
+# quantities; only timing advance has sub-unit resolution (0.5 degree) worth
+# a decimal place
+DASHBOARD_METRICS = (
+    ('RPM', obd.commands.RPM, format_whole),
+    ('Speed', obd.commands.SPEED, format_whole),
+    ('Coolant Temp', obd.commands.COOLANT_TEMP, format_whole),
+    ('Intake Temp', obd.commands.INTAKE_TEMP, format_whole),
+    ('Load', obd.commands.ENGINE_LOAD, format_whole),
+    ('Fuel Level', obd.commands.FUEL_LEVEL, format_whole),
+    ('Throttle Pos', obd.commands.THROTTLE_POS, format_whole),
+    ('Timing Advance', obd.commands.TIMING_ADVANCE, format_quantity),
+)
+
+
+# History log record: timestamp, value, PID (little-endian double, float, byte)
+HISTORY_RECORD = struct.Struct('<dfB')
+
+_magnitude_and_units = attrgetter('magnitude', 'units')
+
+
+def metric_rows(metrics):
+    """Yield (metric, value, unit) CSV rows for a dict of metric values."""
+    for name, value in metrics.items():
+        if isinstance(value, obd.Unit.Quantity):
+            # Handle Pint quantities
+            yield (name, *_magnitude_and_units(value))
+        else:
+            yield (name, value, '')
+
+
+def read_history(filename):
+    """Yield (timestamp, value, pid) records from a metrics history log."""
+    with open(filename, 'rb') as f:
+        data = f.read()
+    # Ignore a partial trailing record left by an unclean shutdown
+    end = len(data) - len(data) % HISTORY_RECORD.size
+    yield from HISTORY_RECORD.iter_unpack(data[:end])
+
+
+def batch_command(commands):
+    """Build one Mode 01 command that requests all of the given PIDs at once.
+
+    The response value is a dict mapping each requested command to its decoded
+    value. PIDs the ECU left out of its reply are simply missing from the dict.
+    """
+    by_pid = {command.pid: command for command in commands}
+
+    def decode(messages):
+        values = {}
+        for message in messages:
+            data = message.data
+            if not data or data[0] != 0x41:
+                continue
+
+            # Reply is 41 followed by <PID> <data bytes> for every PID answered
+            i = 1
+            while i < len(data):
+                command = by_pid.get(data[i])
+                if command is None:
+                    break
+                end = i + command.bytes - 1
+                if end > len(data):
+                    break
+
+                # Hand each PID to its regular decoder as a single-PID message
+                part = copy.copy(message)
+                part.data = bytearray([0x41]) + data[i:end]
+                values[command] = command.decode([part])
+                i = end
+        return values
+
+    pids = b"".join(command.command[2:] for command in commands)
+    return obd.OBDCommand("BATCH_" + pids.decode(), "Batched Mode 01 request",
+                          b"01" + pids, 0, decode, obd.ECU.ENGINE, False)
+
+
+class MetricSlot:
+    """Dashboard entry for one metric: value label, command and formatter."""
+    __slots__ = ('label', 'set', 'cmd', 'fmt', 'last')
+
+    def __init__(self, label, cmd, fmt):
+        self.label = label
+        self.set = label.setText  # pre-bound for the update path
+        self.cmd = cmd
+        self.fmt = fmt
+        self.last = label.text()  # text currently shown
+
+
+class SaveSignals(QObject):
+    """Signals of a SaveJob (QRunnable itself can't define any)."""
+    saved = pyqtSignal(str)  # filename
+    failed = pyqtSignal(str)  # error message
+
+
+class SaveJob(QRunnable):
+    """Writes a snapshot of the latest metric values to a CSV file on a pool thread."""
+
+    def __init__(self, metrics, filename):
+        super().__init__()
+        self.metrics = metrics
+        self.filename = filename
+        self.signals = SaveSignals()
+
+    def run(self):
+        try:
+            with open(self.filename, 'w', newline='', buffering=1 << 16) as f:
+                writer = csv.writer(f)
+                writer.writerow(('Metric', 'Value', 'Unit'))
+                writer.writerows(metric_rows(self.metrics))
+            self.signals.saved.emit(self.filename)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+
+
+class OBDWorker(QObject):
+    """Owns the OBD connection and does all adapter I/O on its own thread.
+
+    Dashboard metrics are watched through obd.Async, which keeps polling them
+    on its own update thread and reports each response through a callback.
+    The callbacks pace that loop and back off requests the ECU never answers.
+    Results are reported back to the GUI through signals only, so a slow
+    ELM327 reply never blocks the event loop of the main window.
+    """
+    connected = pyqtSignal(bool)
+    commands_supported = pyqtSignal(list)  # command names, sent before connected
+    vin_received = pyqtSignal(str)
+    monitor_updated = pyqtSignal(str)
+    metrics_updated = pyqtSignal(list)  # [(name, value or None if no data)]
+    metric_unsupported = pyqtSignal(str)
+    message = pyqtSignal(str)
+    messages = pyqtSignal(list)  # several console lines sharing one timestamp
+    error = pyqtSignal(str, str)  # title, text
+    history_synced = pyqtSignal(str, str)  # metrics file, history file or '' if not synced
+    batch_unanswered = pyqtSignal(object, bool)  # command, partly answered; from the update thread
+    batch_stalled = pyqtSignal(object)  # emitted from the update thread
+
+    def __init__(self, metrics):
+        super().__init__()
+        self.metrics = metrics  # list of (name, command)
+        # OBDCommand.pid re-parses the command string on every access
+        self.pids = {command: command.pid for name, command in metrics}
+        self.connection = None
+        self.history = None
+        self.monitored = None  # command picked in the metrics combo box
+        self.monitor_watched = False  # watched on its own, not a dashboard metric
+        self.active_metrics = []
+        self.metric_batches = []
+        self.pass_end = None  # command whose callback closes a pass
+        self.pass_started = 0.0
+        self.wake = threading.Event()  # cuts a pacing sleep short
+        self.rt_ewma = None
+        self.nulls = {}  # command -> consecutive empty replies
+        self.backoff = set()  # commands currently unwatched
+        self.retry_delay = {}  # command -> next backoff delay
+        self.batch_unanswered.connect(self.split_batch)
+        self.batch_stalled.connect(self.back_off)
+
+    @pyqtSlot(str)
+    def open(self, port):
+        try:
+            # If no port specified, try auto-connect
+            if not port:
+                self.message.emit("No port specified, attempting auto-connect...")
+                self.connection = obd.Async(delay_cmds=0)
+            else:
+                self.message.emit(f"Connecting to {port}...")
+                self.connection = obd.Async(port, delay_cmds=0)
+            
+            if self.connection.status() == obd.OBDStatus.CAR_CONNECTED:
+                # Group supported PIDs into as few requests as possible
+                self.build_metric_batches()
+                
+                # Every response is appended here for the whole session
+                filename = f"obd_history_{time.strftime('%Y%m%d_%H%M%S')}.bin"
+                try:
+                    self.history = open(filename, 'ab', buffering=1 << 20)
+                    self.message.emit(f"Logging metric history to {filename}")
+                except OSError as e:
+                    # Monitoring works without it, so don't fail the connection
+                    self.history = None
+                    self.message.emit(f"Not logging metric history: {str(e)}")
+                
+                # Let the GUI fill in the command list while the VIN is read
+                self.commands_supported.emit([cmd.name for cmd in self.connection.supported_commands
+                                              if cmd.name != "VIN"])
+                self.connected.emit(True)
+                self.read_vin()
+                
+                self.wake.clear()
+                self.pass_started = time.perf_counter()
+                self.connection.start()
+            else:
+                self.message.emit(f"Failed to connect: {self.connection.status()}")
+                self.error.emit("Connection Error",
+                                f"Failed to connect to OBD: {self.connection.status()}")
+                self.close()
+                self.connected.emit(False)
+        except Exception as e:
+            self.message.emit(f"Error connecting: {str(e)}")
+            self.error.emit("Connection Error", f"Error connecting to OBD: {str(e)}")
+            self.close()
+            self.connected.emit(False)
+
+    @pyqtSlot()
+    def close(self):
+        if self.connection:
+            # Don't make the GUI wait out a pacing sleep before the join
+            self.wake.set()
+            self.connection.stop()
+            self.connection.unwatch_all()
+            self.connection.close()
+            self.connection = None
+        if self.history:
+            self.history.close()
+            self.history = None
+        self.monitored = None
+        self.monitor_watched = False
+        self.active_metrics = []
+        self.metric_batches = []
+        self.pass_end = None
+        self.rt_ewma = None
+        self.nulls = {}
+        self.backoff = set()
+        self.retry_delay = {}
+
+    def build_metric_batches(self):
+        # Support never changes for the life of a connection, so check it
+        # once here instead of paying a null round-trip on every update
+        self.active_metrics = [(name, command) for name, command in self.metrics
+                               if self.connection.supports(command)]
+        
+        for name, command in self.metrics:
+            if (name, command) not in self.active_metrics:
+                self.message.emit(f"{name} not supported by vehicle, skipping")
+                self.metric_unsupported.emit(name)
+        
+        self.metric_batches = []
+        for i in range(0, len(self.active_metrics), MAX_PIDS_PER_REQUEST):
+            self.add_metric_batch(self.active_metrics[i:i + MAX_PIDS_PER_REQUEST])
+        self.update_pass_end()
+
+    def add_metric_batch(self, metrics):
+        command = batch_command([command for name, command in metrics])
+        self.metric_batches.append((command, metrics))
+        self.watch_batch(command, metrics)
+
+    def watch_batch(self, command, metrics):
+        # Batched commands are not in supported_commands, so force the watch
+        self.connection.watch(command, callback=self._make_cb(command, metrics), force=True)
+
+    def find_batch(self, command):
+        for batch in self.metric_batches:
+            if batch[0] is command:
+                return batch
+        return None
+
+    def update_pass_end(self):
+        # obd.Async polls in watch order, which metric_batches mirrors. With
+        # no dashboard batch watched, the monitored command has to pace the
+        # loop, or it would be polled back to back
+        watched = [command for command, _ in self.metric_batches
+                   if command not in self.backoff]
+        if watched:
+            self.pass_end = watched[-1]
+        elif self.monitor_watched:
+            self.pass_end = self.monitored
+        else:
+            self.pass_end = None
+
+    def _make_cb(self, command, metrics):
+        def callback(response):
+            # Runs on the obd.Async update thread
+            values = {} if response.is_null() else response.value
+            
+            # A multi-PID reply that leaves out any PID counts as unanswered,
+            # so one dropped frame or timeout doesn't change the grouping
+            if len(values) < len(metrics):
+                misses = self.nulls.get(command, 0) + 1
+                self.nulls[command] = misses
+                if misses >= NULL_BACKOFF_THRESHOLD:
+                    if len(metrics) > 1:
+                        self.batch_unanswered.emit(command, bool(values))
+                    else:
+                        self.batch_stalled.emit(command)
+            else:
+                self.nulls[command] = 0
+                self.retry_delay.pop(command, None)
+            
+            self.publish(metrics, values)
+            
+            if command is self.pass_end:
+                self.pace()
+        return callback
+
+    def pace(self):
+        # Sleeping here, at the end of a pass, delays the next pass of the
+        # update loop
+        elapsed = time.perf_counter() - self.pass_started
+        if self.rt_ewma is None:
+            self.rt_ewma = elapsed
+        else:
+            self.rt_ewma += RT_EWMA_ALPHA * (elapsed - self.rt_ewma)
+        
+        requests = len(self.metric_batches) - len(self.backoff) + self.monitor_watched
+        interval = max(MIN_POLL_INTERVAL,
+                       requests / MAX_REQUESTS_PER_SECOND,
+                       self.rt_ewma * PACING_FACTOR)
+        if interval > elapsed:
+            self.wake.wait(interval - elapsed)
+        self.pass_started = time.perf_counter()
+
+    def publish(self, metrics, values):
+        # Runs for every response, so resolve attributes once up front
+        timestamp = time.time()
+        get = values.get
+        pids = self.pids
+        write = self.history.write if self.history else None
+        pack = HISTORY_RECORD.pack
+        quantity = obd.Unit.Quantity
+        updates = []
+        append = updates.append
+        for name, metric_command in metrics:
+            value = get(metric_command)
+            if value is not None and write:
+                magnitude = value.magnitude if isinstance(value, quantity) else value
+                write(pack(timestamp, float(magnitude), pids[metric_command]))
+            append((name, value))
+        
+        # One signal per response, so the GUI repaints once per batch
+        self.metrics_updated.emit(updates)
+        
+        # A dashboard metric picked for monitoring is not watched twice
+        if self.monitored in values:
+            self.monitor_updated.emit(str(values[self.monitored]))
+
+    @pyqtSlot(str)
+    def sync_history(self, saved):
+        synced = ''
+        if self.history:
+            try:
+                self.history.flush()
+                os.fsync(self.history.fileno())
+                synced = self.history.name
+                self.message.emit(f"Metric history synced to {synced}")
+            except OSError as e:
+                self.message.emit(f"Error syncing metric history: {str(e)}")
+        self.history_synced.emit(saved, synced)
+
+    @pyqtSlot(object, bool)
+    def split_batch(self, command, partial):
+        batch = self.find_batch(command)
+        if batch is None or command in self.backoff:
+            return  # already split or backed off, or disconnected since
+        
+        # A partial reply shows multi-PID requests work, so some member is
+        # at fault and the rest can be polled without it. With no reply at
+        # all, probe one member on its own to tell an adapter or ECU without
+        # multi-PID support from one that isn't answering at all
+        metrics = batch[1]
+        if not partial:
+            with self.paused():
+                probe = obd.OBD.query(self.connection, metrics[0][1])
+            if probe.is_null():
+                self.back_off(command)  # keep the group, retry it later
+                return
+        
+        # Fall back to one PID per request for this group
+        self.message.emit(f"Multi-PID request not fully answered, polling {', '.join(name for name, _ in metrics)} separately")
+        with self.paused():
+            self.connection.unwatch(command)
+            self.metric_batches.remove(batch)
+            for metric in metrics:
+                self.add_metric_batch([metric])
+            self.update_pass_end()
+            self.pass_started = time.perf_counter()
+
+    @pyqtSlot(object)
+    def back_off(self, command):
+        batch = self.find_batch(command)
+        if batch is None or command in self.backoff:
+            return
+        
+        delay = self.retry_delay.get(command, NULL_BACKOFF_INITIAL)
+        self.retry_delay[command] = min(delay * 2, NULL_BACKOFF_MAX)
+        self.message.emit(f"No data for {', '.join(name for name, _ in batch[1])}, retrying in {delay:.0f}s")
+        
+        with self.paused():
+            self.connection.unwatch(command)
+            self.backoff.add(command)
+            self.update_pass_end()
+            self.pass_started = time.perf_counter()
+        
+        # Timer runs on this thread's event loop
+        QTimer.singleShot(int(delay * 1000), lambda: self.retry(command))
+
+    def retry(self, command):
+        batch = self.find_batch(command)
+        if not self.connection or batch is None or command not in self.backoff:
+            return  # disconnected since
+        
+        # A single further empty reply backs off again, for twice as long
+        self.nulls[command] = NULL_BACKOFF_THRESHOLD - 1
+        with self.paused():
+            self.backoff.discard(command)
+            self.metric_batches.remove(batch)
+            self.metric_batches.append(batch)
+            self.watch_batch(*batch)
+            self.update_pass_end()
+            self.pass_started = time.perf_counter()
+        
+        # Not restarted on resume if every batch was backed off
+        self.connection.start()
+
+    def read_vin(self):
+        vin_cmd = obd.commands.VIN
+        if not self.connection.supports(vin_cmd):
+            return
+        
+        try:
+            response = self.query_once(vin_cmd)
+            if not response.is_null():
+                self.vin_received.emit(f"VIN: {response.value}")
+            else:
+                self.vin_received.emit("VIN: Not Available")
+        except Exception as e:
+            self.message.emit(f"Error reading VIN: {str(e)}")
+            self.vin_received.emit("VIN: Not Available")
+
+    @pyqtSlot(str)
+    def monitor(self, name):
+        self.unmonitor()
+        try:
+            command = obd.commands[name]
+            self.monitored = command
+            if any(command == metric for _, metric in self.active_metrics):
+                return  # already polled for the dashboard
+            
+            with self.paused():
+                self.connection.watch(command, callback=self.on_monitor_response)
+                self.monitor_watched = True
+                self.update_pass_end()
+                self.pass_started = time.perf_counter()
+            self.connection.start()
+        except Exception as e:
+            self.monitored = None
+            self.error.emit("Error", f"Failed to start monitoring: {str(e)}")
+
+    @pyqtSlot()
+    def unmonitor(self):
+        if self.monitor_watched:
+            with self.paused():
+                self.connection.unwatch(self.monitored, self.on_monitor_response)
+                self.monitor_watched = False
+                self.update_pass_end()
+                self.pass_started = time.perf_counter()
+        self.monitored = None
+
+    def on_monitor_response(self, response):
+        # Runs on the obd.Async update thread
+        if not response.is_null():
+            self.monitor_updated.emit(str(response.value))
+        
+        if self.pass_end is self.monitored:
+            self.pace()
+
+    @contextmanager
+    def paused(self):
+        # Like obd.Async.paused(), but wakes a pacing sleep so stopping the
+        # loop only waits for the request in flight
+        self.wake.set()
+        with self.connection.paused():
+            self.wake.clear()
+            yield
+
+    def query_once(self, command):
+        # obd.Async.query() only returns watched commands; pause the update
+        # loop and send this one directly
+        with self.paused():
+            return obd.OBD.query(self.connection, command)
+
+    @pyqtSlot()
+    def read_dtc(self):
+        try:
+            self.message.emit("Reading Diagnostic Trouble Codes...")
+            response = self.query_once(obd.commands.GET_DTC)
+            
+            if response.is_null():
+                self.message.emit("No DTCs returned")
+            else:
+                if not response.value:
+                    self.message.emit("No DTCs found")
+                else:
+                    # One console update for the whole dump
+                    lines = [f"Found {len(response.value)} DTCs:"]
+                    lines.extend(f"  {code}: {desc}" for code, desc in response.value)
+                    self.messages.emit(lines)
+        except Exception as e:
+            self.message.emit(f"Error reading DTCs: {str(e)}")
+            self.error.emit("DTC Error", f"Error reading DTCs: {str(e)}")
+
+    @pyqtSlot()
+    def clear_dtc(self):
+        try:
+            self.message.emit("Clearing DTCs...")
+            response = self.query_once(obd.commands.CLEAR_DTC)
+            self.message.emit("DTCs cleared successfully")
+        except Exception as e:
+            self.message.emit(f"Error clearing DTCs: {str(e)}")
+            self.error.emit("DTC Error", f"Error clearing DTCs: {str(e)}")
+
 
 class MainWindow(QMainWindow):
-    """Main GUI window for the OBD-II Reader application."""
-    data_updated = pyqtSignal(str)  # Signal to update GUI from another thread
+    """Main GUI window for the ELM327 OBD-II monitor."""
     
     # Default connection settings
     DEFAULT_HOST = "192.168.0.10"
     DEFAULT_PORT = "35000"
-    DEFAULT_CONNECTION_STRING = f"{DEFAULT_HOST}:{DEFAULT_PORT}"
     AUTO_CONNECT = True  # Set to True to automatically connect on startup
 
     def __init__(self, host=None, port=None):
         super().__init__()
-        self.setWindowTitle("OBD-II Reader")
-        self.setGeometry(100, 100, 400, 500)
-
         # Set connection parameters from constructor arguments (if provided)
         # Otherwise use the default values
         self.host = host or self.DEFAULT_HOST
         self.port = port or self.DEFAULT_PORT
+        
+        self.worker = None
+        self.worker_thread = None
+        self.connected = False
+        self.monitoring = False
+        self.metrics = {}
+        self.log_second = None  # wall-clock second log_stamp was built for
+        self.log_stamp = ''
+        self.init_ui()
+        
+        # Auto-connect on startup if enabled
+        if self.AUTO_CONNECT:
+            # Use a short timer to allow the UI to fully initialize before connecting
+            QTimer.singleShot(500, self.connect_to_adapter)
 
-        # Initialize connection variables
-        self.connection = None
-        self.async_connection = None
-        self.data_log = []  # To store metric data for potential saving
+    def init_ui(self):
+        self.setWindowTitle('ELM327 OBD-II Monitor')
+        self.setMinimumSize(800, 600)
 
-        # GUI Components
-        # Connection Section
-        self.host_label = QLabel("Host:")
+        # Main widget and layout
+        main_widget = QWidget()
+        main_layout = QVBoxLayout()
+        
+        # Connection section
+        connection_layout = QHBoxLayout()
+        
         self.host_input = QLineEdit(self.host)
-        self.port_label = QLabel("Port:")
+        self.host_input.setPlaceholderText('Leave empty to auto-detect')
         self.port_input = QLineEdit(self.port)
-        self.connect_button = QPushButton("Connect")
+        
+        self.connect_button = QPushButton('Connect')
         self.connect_button.clicked.connect(self.connect_to_adapter)
-        self.disconnect_button = QPushButton("Disconnect")
+        self.disconnect_button = QPushButton('Disconnect')
         self.disconnect_button.clicked.connect(self.disconnect_from_adapter)
         self.disconnect_button.setEnabled(False)
-
-        # Status and Info
-        self.status_label = QLabel("Status: Disconnected")
-        self.vin_label = QLabel("VIN: N/A")
-
-        # Metrics Selection
+        
+        connection_layout.addWidget(QLabel('Host:'))
+        connection_layout.addWidget(self.host_input)
+        connection_layout.addWidget(QLabel('Port:'))
+        connection_layout.addWidget(self.port_input)
+        connection_layout.addWidget(self.connect_button)
+        connection_layout.addWidget(self.disconnect_button)
+        
+        # Status section
+        status_layout = QHBoxLayout()
+        self.status_label = QLabel('Disconnected')
+        self.status_label.setStyleSheet('color: red;')
+        self.vin_label = QLabel('VIN: N/A')
+        status_layout.addWidget(QLabel('Status:'))
+        status_layout.addWidget(self.status_label)
+        status_layout.addStretch()
+        status_layout.addWidget(self.vin_label)
+        
+        # Metrics section
+        metrics_layout = QGridLayout()
+        
+        # Create labels for common OBD metrics
+        self.metric_widgets = {}
+        
+        row = 0
+        col = 0
+        for i, (name, command, formatter) in enumerate(DASHBOARD_METRICS):
+            # Create label with name
+            label = QLabel(f"{name}:")
+            
+            # Create value label
+            value = QLabel("--")
+            value.setStyleSheet("font-size: 16px; font-weight: bold;")
+            
+            # Save reference to value label and command
+            self.metric_widgets[name] = MetricSlot(value, command, formatter)
+            
+            # Add to grid
+            metrics_layout.addWidget(label, row, col * 2)
+            metrics_layout.addWidget(value, row, col * 2 + 1)
+            
+            # Update grid position
+            col += 1
+            if col > 1:  # 2 columns of metrics
+                col = 0
+                row += 1
+        
+        # Monitoring of any other supported command
+        monitor_layout = QHBoxLayout()
+        
         self.metrics_combo = QComboBox()
         self.metrics_combo.addItem("Select a metric")
-        self.start_button = QPushButton("Start Monitoring")
+        self.start_button = QPushButton('Start Monitoring')
         self.start_button.clicked.connect(self.start_monitoring)
         self.start_button.setEnabled(False)
-        self.stop_button = QPushButton("Stop Monitoring")
+        self.stop_button = QPushButton('Stop Monitoring')
         self.stop_button.clicked.connect(self.stop_monitoring)
         self.stop_button.setEnabled(False)
-
-        # Data Display
-        self.data_label = QLabel("Data: N/A")
-
-        # Layout
-        layout = QVBoxLayout()
-        layout.addWidget(self.host_label)
-        layout.addWidget(self.host_input)
-        layout.addWidget(self.port_label)
-        layout.addWidget(self.port_input)
-        layout.addWidget(self.connect_button)
-        layout.addWidget(self.disconnect_button)
-        layout.addWidget(self.status_label)
-        layout.addWidget(self.vin_label)
-        layout.addWidget(self.metrics_combo)
-        layout.addWidget(self.start_button)
-        layout.addWidget(self.stop_button)
-        layout.addWidget(self.data_label)
-        layout.addStretch()  # Pushes content to the top
-
-        # Set up the central widget
-        container = QWidget()
-        container.setLayout(layout)
-        self.setCentralWidget(container)
-
-        # Connect signal to slot for thread-safe GUI updates
-        self.data_updated.connect(self.update_data_label)
+        self.data_label = QLabel('Data: N/A')
         
-        # Auto-connect on startup if enabled
-        if self.AUTO_CONNECT:
-            # Use a short timer to allow the UI to fully initialize before connecting
-            QTimer.singleShot(500, self.connect_to_adapter)
+        monitor_layout.addWidget(self.metrics_combo)
+        monitor_layout.addWidget(self.start_button)
+        monitor_layout.addWidget(self.stop_button)
+        monitor_layout.addWidget(self.data_label)
+        monitor_layout.addStretch()
+        
+        # Console output
+        self.console = QPlainTextEdit()
+        self.console.setReadOnly(True)
+        self.console.setMaximumBlockCount(CONSOLE_MAX_LINES)
+        self.console.setCenterOnScroll(True)
+        
+        # Buttons for additional actions
+        actions_layout = QHBoxLayout()
+        
+        read_dtc_button = QPushButton('Read DTCs')
+        read_dtc_button.clicked.connect(self.read_dtc)
+        
+        clear_dtc_button = QPushButton('Clear DTCs')
+        clear_dtc_button.clicked.connect(self.clear_dtc)
+        
+        save_button = QPushButton('Save Metrics')
+        save_button.clicked.connect(self.save_metrics)
+        
+        actions_layout.addWidget(read_dtc_button)
+        actions_layout.addWidget(clear_dtc_button)
+        actions_layout.addWidget(save_button)
+        
+        # Add all layouts to main layout
+        main_layout.addLayout(connection_layout)
+        main_layout.addLayout(status_layout)
+        main_layout.addLayout(metrics_layout)
+        main_layout.addLayout(monitor_layout)
+        main_layout.addWidget(QLabel('Console:'))
+        main_layout.addWidget(self.console)
+        main_layout.addLayout(actions_layout)
+        
+        # Set the main layout
+        main_widget.setLayout(main_layout)
+        self.setCentralWidget(main_widget)
+        
+        self.log('Application started')
+
+    def timestamp(self):
+        # strftime is only needed once per second, bursts reuse the cached stamp
+        now = time.time()
+        second = int(now)
+        if second != self.log_second:
+            self.log_second = second
+            self.log_stamp = time.strftime(LOG_TIME_FORMAT, time.localtime(second))
+        millis = int((now - second) * 1000)
+        return f"{self.log_stamp}.{millis:03d}"
+
+    def log(self, message):
+        self.console.appendPlainText(f"[{self.timestamp()}] {message}")
+
+    def log_lines(self, messages):
+        # Appended as a single block of text, so the console updates once
+        timestamp = self.timestamp()
+        self.console.appendPlainText("\n".join(f"[{timestamp}] {message}" for message in messages))
 
     def connect_to_adapter(self):
-        """Attempt to connect to the Wi-Fi ELM327 adapter."""
-        host = self.host_input.text() or self.host
-        port = self.port_input.text() or self.port
-        connection_string = f"{host}:{port}"
+        """Start the worker thread and connect to the ELM327 adapter."""
+        if self.worker_thread:
+            return  # already connected or connecting
+        
+        host = self.host_input.text()
+        port = self.port_input.text()
+        # If no host specified, let python-OBD auto-detect the adapter
+        connection_string = f"{host}:{port}" if host else ""
+        
+        self.connect_button.setEnabled(False)
+        self.status_label.setText('Connecting...')
+        self.status_label.setStyleSheet('color: orange;')
+        
+        # All adapter I/O happens on the worker thread
+        self.worker_thread = QThread()
+        self.worker = OBDWorker([(name, data.cmd)
+                                 for name, data in self.metric_widgets.items()])
+        self.worker.moveToThread(self.worker_thread)
+        self.worker.connected.connect(self.on_connected)
+        self.worker.commands_supported.connect(self.on_commands_supported)
+        self.worker.vin_received.connect(self.vin_label.setText)
+        self.worker.metrics_updated.connect(self.update_metrics)
+        self.worker.metric_unsupported.connect(self.on_metric_unsupported)
+        self.worker.monitor_updated.connect(self.update_data_label)
+        self.worker.message.connect(self.log)
+        self.worker.messages.connect(self.log_lines)
+        self.worker.error.connect(self.show_error)
+        self.worker.history_synced.connect(self.on_history_synced)
+        self.worker_thread.start()
+        
+        QMetaObject.invokeMethod(self.worker, 'open', Qt.QueuedConnection,
+                                 Q_ARG(str, connection_string))
+
+    def on_connected(self, success):
+        if success:
+            self.connected = True
+            self.disconnect_button.setEnabled(True)
+            self.start_button.setEnabled(True)
+            self.status_label.setText('Connected')
+            self.status_label.setStyleSheet('color: green;')
+            self.log("Successfully connected to vehicle")
+        else:
+            self.stop_worker()
+            self.connect_button.setEnabled(True)
+            self.status_label.setText('Disconnected')
+            self.status_label.setStyleSheet('color: red;')
 
+    def on_commands_supported(self, names):
+        # Populate metrics combo box with supported commands in one model
+        # update, without a currentTextChanged signal per item
+        self.metrics_combo.blockSignals(True)
         try:
-            self.status_label.setText("Status: Connecting...")
-            QApplication.processEvents()  # Update GUI immediately
-            self.connection = obd.OBD(connection_string)
-            if self.connection.is_connected():
-                self.status_label.setText(f"Status: Connected to {connection_string}")
-                self.connect_button.setEnabled(False)
-                self.disconnect_button.setEnabled(True)
-                self.start_button.setEnabled(True)
-
-                # Retrieve VIN (if supported)
-                vin_cmd = obd.commands.VIN
-                if self.connection.supports(vin_cmd):
-                    response = self.connection.query(vin_cmd)
-                    if not response.is_null():
-                        self.vin_label.setText(f"VIN: {response.value}")
-                    else:
-                        self.vin_label.setText("VIN: Not Available")
-                
-                # Populate metrics combo box with supported commands
-                self.metrics_combo.clear()
-                supported_cmds = [cmd for cmd in self.connection.supported_commands if cmd.name != "VIN"]
-                for cmd in supported_cmds:
-                    self.metrics_combo.addItem(cmd.name)
-            else:
-                self.status_label.setText("Status: Connection Failed")
-                QMessageBox.critical(self, "Error", f"Failed to connect to the adapter at {connection_string}.")
-        except Exception as e:
-            self.status_label.setText("Status: Disconnected")
-            QMessageBox.critical(self, "Error", f"Connection error: {str(e)}")
+            self.metrics_combo.clear()
+            self.metrics_combo.addItems(names)
+        finally:
+            self.metrics_combo.blockSignals(False)
+
+    def stop_worker(self):
+        if self.worker_thread:
+            # Close the connection on the worker's own thread before it exits
+            QMetaObject.invokeMethod(self.worker, 'close', Qt.BlockingQueuedConnection)
+            self.worker_thread.quit()
+            self.worker_thread.wait()
+            self.worker_thread = None
+            self.worker = None
 
     def disconnect_from_adapter(self):
         """Disconnect from the adapter and clean up."""
-        if self.async_connection:
-            self.async_connection.stop()
-            self.async_connection = None
-        if self.connection:
-            self.connection.close()
-            self.connection = None
-        self.status_label.setText("Status: Disconnected")
+        was_connected = self.connected
+        self.stop_worker()
+        
+        self.connected = False
+        self.monitoring = False
         self.connect_button.setEnabled(True)
         self.disconnect_button.setEnabled(False)
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(False)
-        self.vin_label.setText("VIN: N/A")
-        self.data_label.setText("Data: N/A")
+        self.status_label.setText('Disconnected')
+        self.status_label.setStyleSheet('color: red;')
+        self.vin_label.setText('VIN: N/A')
+        self.data_label.setText('Data: N/A')
         self.metrics_combo.setCurrentIndex(0)
+        
+        # Reset all metric displays
+        for metric in self.metric_widgets.values():
+            metric.label.setText('--')
+            metric.label.setEnabled(True)
+            metric.last = '--'
+        
+        if was_connected:
+            self.log("Disconnected from vehicle")
+
+    def update_metrics(self, values):
+        if not self.connected:
+            return  # drop updates queued before disconnect_from_adapter
+        
+        widgets = self.metric_widgets
+        metrics = self.metrics
+        changed = []
+        for name, value in values:
+            data = widgets[name]
+            if value is None:
+                text = 'N/A'
+            else:
+                # Store metric value
+                metrics[name] = value
+                
+                # Format value
+                text = data.fmt(value)
+            
+            # setText marks the label dirty even if the text is the same
+            if text != data.last:
+                data.last = text
+                changed.append((data.set, text))
+        
+        if not changed:
+            return  # nothing to repaint
+        
+        # Hold repaints until every changed label has its new text
+        widget = self.centralWidget()
+        widget.setUpdatesEnabled(False)
+        try:
+            for set_text, text in changed:
+                set_text(text)
+        finally:
+            # Re-enabling schedules a single repaint of the whole widget
+            widget.setUpdatesEnabled(True)
+
+    def on_metric_unsupported(self, name):
+        data = self.metric_widgets[name]
+        data.label.setText('n/a')
+        data.label.setEnabled(False)  # greyed out, never polled
+        data.last = 'n/a'
+
+    def show_error(self, title, text):
+        QMessageBox.critical(self, title, text)
 
     def start_monitoring(self):
-        """Start asynchronous monitoring of the selected metric."""
-        if not self.connection or not self.connection.is_connected():
+        """Watch the metric selected in the combo box alongside the dashboard."""
+        if not self.connected:
             QMessageBox.warning(self, "Warning", "Not connected to the adapter.")
             return
 
@@ -154,46 +876,82 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Warning", "Please select a metric to monitor.")
             return
 
-        try:
-            cmd = obd.commands[selected_metric]
-            self.async_connection = obd.Async(port=self.connection.port)  # Reuse existing connection port
-            self.async_connection.watch(cmd, callback=self.on_data_received)
-            self.async_connection.start()
-            self.start_button.setEnabled(False)
-            self.stop_button.setEnabled(True)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to start monitoring: {str(e)}")
-            self.stop_monitoring()
+        # Reuses the worker's connection, never a second one to the adapter
+        QMetaObject.invokeMethod(self.worker, 'monitor', Qt.QueuedConnection,
+                                 Q_ARG(str, selected_metric))
+        self.monitoring = True
+        self.start_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
 
     def stop_monitoring(self):
-        """Stop asynchronous monitoring."""
-        if self.async_connection:
-            self.async_connection.stop()
-            self.async_connection = None
-        self.start_button.setEnabled(True)
+        """Stop watching the selected metric."""
+        if self.worker:
+            QMetaObject.invokeMethod(self.worker, 'unmonitor', Qt.QueuedConnection)
+        self.monitoring = False
+        self.start_button.setEnabled(self.connected)
         self.stop_button.setEnabled(False)
         self.data_label.setText("Data: N/A")
 
-    def on_data_received(self, response):
-        """Callback for when new data is received."""
-        if not response.is_null():
-            value = str(response.value)
-            timestamp = time.time()
-            self.data_log.append((timestamp, value))  # Store data for potential saving
-            self.data_updated.emit(value)  # Emit signal to update GUI
-
     def update_data_label(self, value):
         """Slot to update the data label in the main thread."""
-        self.data_label.setText(f"Data: {value}")
+        if self.monitoring:  # drop updates queued before stop_monitoring
+            self.data_label.setText(f"Data: {value}")
+
+    def read_dtc(self):
+        if not self.connected:
+            QMessageBox.warning(self, "Not Connected", "Please connect to vehicle first")
+            return
+        
+        QMetaObject.invokeMethod(self.worker, 'read_dtc', Qt.QueuedConnection)
+
+    def clear_dtc(self):
+        if not self.connected:
+            QMessageBox.warning(self, "Not Connected", "Please connect to vehicle first")
+            return
+            
+        reply = QMessageBox.question(self, 'Clear DTCs', 
+                                   'Are you sure you want to clear all DTCs?',
+                                   QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        
+        if reply == QMessageBox.Yes:
+            QMetaObject.invokeMethod(self.worker, 'clear_dtc', Qt.QueuedConnection)
+
+    def save_metrics(self):
+        # Write a snapshot on a pool thread so disk I/O never blocks the GUI
+        filename = f"obd_metrics_{time.strftime('%Y%m%d_%H%M%S')}.csv"
+        job = SaveJob(dict(self.metrics), filename)
+        job.signals.saved.connect(self.on_metrics_saved)
+        job.signals.failed.connect(self.on_save_failed)
+        QThreadPool.globalInstance().start(job)
+
+    def on_metrics_saved(self, filename):
+        self.log(f"Metrics saved to {filename}")
+        if self.connected:
+            # History is already on disk, confirm once it is durable too
+            QMetaObject.invokeMethod(self.worker, 'sync_history', Qt.QueuedConnection,
+                                     Q_ARG(str, filename))
+        else:
+            QMessageBox.information(self, "Metrics Saved", f"Metrics saved to {filename}")
+
+    def on_history_synced(self, filename, history):
+        text = f"Metrics saved to {filename}"
+        if history:
+            text += f"\nMetric history synced to {history}"
+        QMessageBox.information(self, "Metrics Saved", text)
+
+    def on_save_failed(self, error):
+        self.log(f"Error saving metrics: {error}")
+        QMessageBox.critical(self, "Save Error", f"Error saving metrics: {error}")
 
     def closeEvent(self, event):
         """Handle window close event to clean up resources."""
-        self.disconnect_from_adapter()
+        self.stop_worker()
         event.accept()
 
-if __name__ == "__main__":
+
+def main():
     # Parse command line arguments
-    parser = argparse.ArgumentParser(description='OBD-II Wi-Fi Adapter Connection')
+    parser = argparse.ArgumentParser(description='ELM327 OBD-II Monitor')
     parser.add_argument('--host', help='ELM327 adapter IP address')
     parser.add_argument('--port', help='ELM327 adapter port number')
     parser.add_argument('--no-auto-connect', action='store_true', help='Disable auto-connect on startup')
@@ -203,7 +961,15 @@ if __name__ == "__main__":
     if args.no_auto_connect:
         MainWindow.AUTO_CONNECT = False
     
-    app = QApplication(sys.argv)
-    window = MainWindow(host=args.host, port=args.port)
-    window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    try:
+        app = QApplication(sys.argv)
+        window = MainWindow(host=args.host, port=args.port)
+        window.show()
+        sys.exit(app.exec_())
+    except Exception as e:
+        print(f"Fatal error: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()